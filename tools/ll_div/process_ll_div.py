@@ -3,17 +3,43 @@
 
 import sys
 import os
+import argparse
+import mmap
+from bisect import bisect_right
+from itertools import islice
+from operator import itemgetter
+
+# 输出文件的缓冲区大小和每批写入的行数
+WRITE_BUFFER_SIZE = 1 << 20
+WRITE_BATCH_LINES = 8192
+
+def read_lines(filename):
+    """通过内存映射一次性读取整个文件并按行切分"""
+    with open(filename, 'rb') as f:
+        # 空文件无法映射
+        if os.fstat(f.fileno()).st_size == 0:
+            return []
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            # 映射内容只会被顺序读取一遍，提示内核按顺序预读
+            if hasattr(mmap, 'MADV_SEQUENTIAL'):
+                mm.madvise(mmap.MADV_SEQUENTIAL)
+            text = str(mm, 'utf-8')
+    # 与文本模式读取一致，\r\n和单独的\r都视为换行
+    lines = text.replace('\r\n', '\n').replace('\r', '\n').split('\n')
+    # 与逐行迭代文件一致，末尾换行之后不算作一行
+    if lines[-1] == '':
+        lines.pop()
+    return lines
 
 def load_split_table(filename):
     """加载拆分表"""
     split_dict = {}
     try:
-        with open(filename, 'r', encoding='utf-8') as f:
-            for line in f:
-                line = line.strip()
-                if line and '\t' in line:
-                    char, split_info = line.split('\t', 1)
-                    split_dict[char] = split_info.strip()
+        for line in read_lines(filename):
+            line = line.strip()
+            if line and '\t' in line:
+                char, split_info = line.split('\t', 1)
+                split_dict[char] = split_info.strip()
         print(f"加载拆分表: {len(split_dict)} 条记录")
     except Exception as e:
         print(f"加载拆分表错误: {e}")
@@ -23,20 +49,19 @@ def load_pinyin_table(filename):
     """加载拼音表，处理多个拼音的情况"""
     pinyin_dict = {}
     try:
-        with open(filename, 'r', encoding='utf-8') as f:
-            for line in f:
-                line = line.strip()
-                if line and '\t' in line:
-                    char, pinyin = line.split('\t', 1)
-                    pinyin = pinyin.strip()
-                    
-                    # 如果汉字已存在，合并拼音（用下划线连接）
-                    if char in pinyin_dict:
-                        existing_pinyin = pinyin_dict[char]
-                        if pinyin not in existing_pinyin.split('_'):
-                            pinyin_dict[char] = existing_pinyin + '_' + pinyin
-                    else:
-                        pinyin_dict[char] = pinyin
+        for line in read_lines(filename):
+            line = line.strip()
+            if line and '\t' in line:
+                char, pinyin = line.split('\t', 1)
+                pinyin = sys.intern(pinyin.strip())
+                
+                # 如果汉字已存在，合并拼音（用下划线连接）
+                if char in pinyin_dict:
+                    existing_pinyin = pinyin_dict[char]
+                    if pinyin not in existing_pinyin.split('_'):
+                        pinyin_dict[char] = existing_pinyin + '_' + pinyin
+                else:
+                    pinyin_dict[char] = pinyin
         print(f"加载拼音表: {len(pinyin_dict)} 条记录")
     except Exception as e:
         print(f"加载拼音表错误: {e}")
@@ -46,109 +71,151 @@ def load_unicode_table(filename):
     """加载Unicode表"""
     unicode_dict = {}
     try:
-        with open(filename, 'r', encoding='utf-8') as f:
-            for line in f:
-                line = line.strip()
-                if line and '\t' in line:
-                    unicode_range, alias = line.split('\t', 1)
-                    unicode_dict[unicode_range] = alias.strip()
+        for line in read_lines(filename):
+            line = line.strip()
+            if line and '\t' in line:
+                unicode_range, alias = line.split('\t', 1)
+                unicode_dict[unicode_range] = sys.intern(alias.strip())
         print(f"加载Unicode表: {len(unicode_dict)} 条记录")
     except Exception as e:
         print(f"加载Unicode表错误: {e}")
     return unicode_dict
 
-def get_unicode_info(char, unicode_dict):
-    """获取Unicode编码和别名"""
-    # 获取Unicode编码
-    unicode_code = f"U+{ord(char):04X}"
-    
-    # 查找对应的Unicode别名
-    unicode_alias = ""
+def build_unicode_ranges(unicode_dict):
+    """将Unicode表整理为按起始码位排序且互不重叠的区间列表"""
+    unicode_ranges = []
     for unicode_range, alias in unicode_dict.items():
         if '..' in unicode_range:
-            start_hex, end_hex = unicode_range.split('..')
-            start_code = int(start_hex[2:], 16)
-            end_code = int(end_hex[2:], 16)
-            char_code = ord(char)
-            if start_code <= char_code <= end_code:
-                unicode_alias = alias
-                break
+            try:
+                start_hex, end_hex = unicode_range.split('..')
+                range_start = int(start_hex[2:], 16)
+                range_end = int(end_hex[2:], 16)
+                # 起止颠倒的区段同样视为格式错误
+                if range_start > range_end:
+                    raise ValueError(unicode_range)
+                pieces = [(range_start, range_end)]
+            except ValueError:
+                print(f"Unicode表区段格式错误，已跳过: {unicode_range}")
+                continue
+            # 区段有重叠时以表中靠前的为准，只保留尚未被覆盖的部分
+            for start_code, end_code, _ in unicode_ranges:
+                remaining = []
+                for piece_start, piece_end in pieces:
+                    if piece_start < start_code:
+                        remaining.append((piece_start, min(piece_end, start_code - 1)))
+                    if piece_end > end_code:
+                        remaining.append((max(piece_start, end_code + 1), piece_end))
+                pieces = remaining
+            unicode_ranges.extend((start_code, end_code, alias) for start_code, end_code in pieces)
+    unicode_ranges.sort()
+    return unicode_ranges
+
+def build_unicode_page_table(unicode_ranges):
+    """按256个码位分页预计算Unicode别名，整页属于同一区段时可直接查表"""
+    page_table = [""] * 0x1100
+    for start_code, end_code, alias in unicode_ranges:
+        # 超出U+10FFFF的部分不会出现在文本中，不必分页
+        for page in range(start_code >> 8, (min(end_code, 0x10FFFF) >> 8) + 1):
+            if start_code <= page << 8 and (page << 8 | 0xFF) <= end_code:
+                page_table[page] = alias
+            else:
+                # 该页跨越多个区段，查找时需要二分
+                page_table[page] = None
+    return page_table
+
+def make_unicode_lookup(unicode_ranges):
+    """生成按码位查询Unicode别名的函数"""
+    # 区间的起止码位和别名分别存放在平行的列表中，二分时只访问起始码位
+    range_starts = [start_code for start_code, _, _ in unicode_ranges]
+    range_ends = [end_code for _, end_code, _ in unicode_ranges]
+    range_aliases = [alias for _, _, alias in unicode_ranges]
+    page_table = build_unicode_page_table(unicode_ranges)
+    # 上一次二分命中的区段，相邻码位通常落在同一区段
+    last_range = [1, 0, ""]
+    
+    def lookup(char_code):
+        # 整页属于同一区段时直接查表
+        alias = page_table[char_code >> 8]
+        if alias is not None:
+            return alias
+        
+        if last_range[0] <= char_code <= last_range[1]:
+            return last_range[2]
+        
+        # 二分查找起始码位不大于该字符的最后一个区段，再只比较一次结束码位
+        index = bisect_right(range_starts, char_code) - 1
+        if index >= 0 and char_code <= range_ends[index]:
+            last_range[:] = range_starts[index], range_ends[index], range_aliases[index]
+            return range_aliases[index]
+        return ""
+    
+    return lookup
+
+def build_sorted_rows(chars, split_dict, pinyin_dict, unicode_lookup):
+    """为一批汉字构建输出行，返回按Unicode编码值排序的(编码值, 输出行)列表"""
+    # 获取拆分信息（逐项生成，不额外保存整列）
+    split_infos = (split_dict.get(char, "") for char in chars)
+    # 获取拼音信息，并将拼音格式化为下划线连接
+    pinyin_infos = (pinyin_dict.get(char, "").replace(' ', '_') for char in chars)
+    # 获取Unicode编码值和别名
+    unicode_values = list(map(ord, chars))
+    unicode_aliases = map(unicode_lookup, unicode_values)
     
-    return unicode_code, unicode_alias
+    # 构建输出行，并带上Unicode编码值用于排序
+    data_to_sort = [
+        (unicode_value, f"{char}\t[{split_info},{pinyin_info},{unicode_alias},U+{unicode_value:04X}]")
+        for char, split_info, pinyin_info, unicode_alias, unicode_value
+        in zip(chars, split_infos, pinyin_infos, unicode_aliases, unicode_values)
+    ]
+    data_to_sort.sort(key=itemgetter(0))
+    return data_to_sort
 
-def process_ll_div(input_file, output_file, split_dict, pinyin_dict, unicode_dict):
+def process_ll_div(input_file, output_file, split_dict, pinyin_dict, unicode_dict, verbose=False):
     """处理ll_div.txt文件并按Unicode编码排序"""
     processed_count = 0
     error_count = 0
-    data_lines = []
+    comment_lines = []
+    chars = []
     
     try:
-        with open(input_file, 'r', encoding='utf-8') as infile:
+        unicode_lookup = make_unicode_lookup(build_unicode_ranges(unicode_dict))
+        
+        for line_num, line in enumerate(read_lines(input_file), 1):
+            line = line.strip()
             
-            for line_num, line in enumerate(infile, 1):
-                line = line.strip()
-                
-                # 跳过空行和注释行
-                if not line or line.startswith('#'):
-                    data_lines.append((0, line))  # 注释行放在最前面
-                    continue
+            # 跳过空行和注释行
+            if not line or line.startswith('#'):
+                comment_lines.append(line)  # 注释行放在最前面
+                continue
+            
+            # 解析每行数据，这里只收集汉字，各项信息随后按列批量查询
+            if '\t' in line:
+                chars.append(line.split('\t', 1)[0])
                 
-                # 解析每行数据
-                if '\t' in line:
-                    char, rest = line.split('\t', 1)
-                    
-                    # 获取拆分信息
-                    split_info = split_dict.get(char, "")
-                    
-                    # 获取拼音信息
-                    pinyin_info = pinyin_dict.get(char, "")
-                    # 将拼音格式化为下划线连接
-                    if pinyin_info:
-                        pinyin_info = pinyin_info.replace(' ', '_')
-                    
-                    # 获取Unicode信息
-                    unicode_code, unicode_alias = get_unicode_info(char, unicode_dict)
-                    
-                    # 构建输出行
-                    output_line = f"{char}\t[{split_info},{pinyin_info},{unicode_alias},{unicode_code}]"
-                    
-                    # 计算Unicode编码值用于排序
-                    unicode_value = ord(char)
-                    data_lines.append((unicode_value, output_line))
-                    
-                    processed_count += 1
-                    
-                    # 进度显示
-                    if processed_count % 1000 == 0:
-                        print(f"已处理 {processed_count} 行...")
+                processed_count += 1
                 
-                else:
-                    print(f"第 {line_num} 行格式错误: {line}")
-                    error_count += 1
-        
-        # 按Unicode编码值排序
-        print("正在按Unicode编码排序...")
-        # 注释行保持在前，其他按Unicode值排序
-        sorted_lines = []
-        comment_lines = []
-        data_to_sort = []
-        
-        for unicode_value, line in data_lines:
-            if unicode_value == 0:  # 注释行
-                comment_lines.append(line)
+                # 进度显示，仅在--verbose时输出
+                if verbose and processed_count % 1000 == 0:
+                    print(f"已处理 {processed_count} 行...")
+            
             else:
-                data_to_sort.append((unicode_value, line))
+                print(f"第 {line_num} 行格式错误: {line}")
+                error_count += 1
         
-        # 对数据行按Unicode值排序
-        data_to_sort.sort(key=lambda x: x[0])
-        
-        # 合并结果：注释行 + 排序后的数据行
-        sorted_lines = comment_lines + [line for _, line in data_to_sort]
+        # 按Unicode编码值排序，注释行保持在前
+        print("正在按Unicode编码排序...")
+        data_to_sort = build_sorted_rows(chars, split_dict, pinyin_dict, unicode_lookup)
         
-        # 写入输出文件
-        with open(output_file, 'w', encoding='utf-8') as outfile:
-            for line in sorted_lines:
-                outfile.write(line + '\n')
+        # 写入输出文件：注释行在前，排序后的数据行边取边写，每次拼接一批行后整体写入
+        with open(output_file, 'w', encoding='utf-8', buffering=WRITE_BUFFER_SIZE) as outfile:
+            if comment_lines:
+                outfile.write('\n'.join(comment_lines) + '\n')
+            sorted_lines = map(itemgetter(1), data_to_sort)
+            while True:
+                batch = list(islice(sorted_lines, WRITE_BATCH_LINES))
+                if not batch:
+                    break
+                outfile.write('\n'.join(batch) + '\n')
         
         print(f"处理完成! 共处理 {processed_count} 行，错误 {error_count} 行")
         
@@ -156,6 +223,10 @@ def process_ll_div(input_file, output_file, split_dict, pinyin_dict, unicode_dic
         print(f"处理文件时出错: {e}")
 
 def main():
+    parser = argparse.ArgumentParser(description="补全ll_div.txt的拆分、拼音和Unicode信息")
+    parser.add_argument("-v", "--verbose", action="store_true", help="显示处理进度")
+    args = parser.parse_args()
+    
     # 文件路径
     ll_div_file = "ll_div.txt"
     split_file = "拆分表.txt"
@@ -171,7 +242,7 @@ def main():
     unicode_dict = load_unicode_table(unicode_file)
     
     # 处理ll_div.txt文件
-    process_ll_div(ll_div_file, output_file, split_dict, pinyin_dict, unicode_dict)
+    process_ll_div(ll_div_file, output_file, split_dict, pinyin_dict, unicode_dict, args.verbose)
     
     print(f"处理完成! 输出文件: {output_file}")
 